@@ -1,250 +1,632 @@
-import os
-import pandas as pd
-import streamlit as st
-
-# ----------------------------
-# Failure code meaningss
-# ----------------------------
-failure_meanings = {
-    2: "Rejected by vision before electrical test",
-    3: "Rejected by vision after electrical test",
-    4: "Rejected by electrical test",
-    5: "Not placed (lost after electrical test)",
-    6: "Not taken by the machine",
-    7: "Rejected by vision before pick-up"
-}
-
-
-# ----------------------------
-# Analysis function
-# ----------------------------
-def analyze_logs(file_paths):
-    all_halts = []
-    replenishments = []
-    all_data = []
-    skipped_rows_log = []
-
-    for file_path in file_paths:
-        filename = os.path.basename(file_path)
-
-        # --- Step 1: Product name from cell B1
-        try:
-            header_df = pd.read_csv(
-                file_path,
-                encoding="latin1",
-                nrows=2,
-                header=None,
-                engine="python",
-                on_bad_lines="skip"
-            )
-            product_name = header_df.iloc[0, 1] if header_df.shape[1] > 1 else "Unknown"
-        except Exception:
-            product_name = "Unknown"
-
-        # --- Step 2: Load actual log data (keep 12 columns as before)
-        try:
-            df = pd.read_csv(
-                file_path,
-                encoding="latin1",
-                skiprows=2,
-                usecols=range(12),
-                on_bad_lines=lambda x: skipped_rows_log.append((filename, x)) or None,
-                engine="python"
-            )
-        except Exception as e:
-            st.warning(f"Skipping {filename}, error reading file: {e}")
-            continue
-
-        # --- Step 3: Rename columns
-        df = df.rename(columns={
-            df.columns[1]: "PartNumber",
-            df.columns[2]: "Description",
-            df.columns[3]: "Reference",
-            df.columns[6]: "BatchNumber",
-            df.columns[7]: "ColumnH",   # <-- Added
-            df.columns[8]: "ColumnI",   # <-- Added
-            df.columns[11]: "Result"
-        })
-
-        # Include new columns (H, I)
-        df_relevant = df[["PartNumber", "Description", "Reference", "BatchNumber", "ColumnH", "ColumnI", "Result"]].dropna(subset=["PartNumber"])
-        df_relevant["Result"] = pd.to_numeric(df_relevant["Result"], errors="coerce").fillna(0).astype(int)
-
-        df_relevant["ProductName"] = product_name
-        df_relevant["File"] = filename
-        df_relevant["FilePath"] = file_path  # keep path for later lookup
-        all_data.append(df_relevant)
-
-        # --- Step 4: Detect halts/replenishments (unchanged)
-        for part, group in df_relevant.groupby("PartNumber"):
-            group = group.reset_index(drop=True)
-            n = len(group)
-            i = 0
-
-            while i <= n - 3:
-                r0, r1, r2 = group.loc[i, "Result"], group.loc[i + 1, "Result"], group.loc[i + 2, "Result"]
-
-                # Three consecutive fails (known failures only)
-                if r0 in failure_meanings and r1 in failure_meanings and r2 in failure_meanings:
-                    batch_here = str(group.loc[i, "BatchNumber"]).strip()
-                    next_pass = group[(group.index > i + 2) & (group["Result"] == 0)].head(1)
-
-                    fail_codes = [r0, r1, r2]
-                    fail_text = ", ".join(
-                        f"{code} → {failure_meanings.get(code)}" for code in fail_codes
-                    )
-                    main_fail = fail_codes[0]
-
-                    event = {
-                        "ProductName": product_name,
-                        "File": filename,
-                        "FilePath": file_path,
-                        "PartNumber": group.loc[i, "PartNumber"],
-                        "Description": group.loc[i, "Description"],
-                        "Reference": group.loc[i, "Reference"],
-                        "BatchNumber": batch_here,
-                        "ColumnH": group.loc[i, "ColumnH"],  # Added
-                        "ColumnI": group.loc[i, "ColumnI"],  # Added
-                        "FailCodes": fail_text,
-                        "MainFailType": failure_meanings[main_fail]
-                    }
-
-                    if not next_pass.empty:
-                        next_batch = str(next_pass["BatchNumber"].values[0]).strip()
-                        if next_batch != batch_here:
-                            replenishments.append(event)
-                        else:
-                            all_halts.append(event)
-                    else:
-                        all_halts.append(event)
-                    i += 3
-                    continue
-                i += 1
-
-    return (
-        pd.DataFrame(all_halts),
-        pd.DataFrame(replenishments),
-        pd.concat(all_data, ignore_index=True) if all_data else pd.DataFrame()
-    )
-
-
-# ----------------------------
-# Streamlit App
-# ----------------------------
-st.title("PCB Log Analysis Dashboard")
-
-uploaded_files = st.file_uploader(
-    "Upload multiple CSV log files",
-    type=["csv"],
-    accept_multiple_files=True
-)
-
-if uploaded_files:
-    if st.button("Run Analysis"):
-        file_paths = []
-        for f in uploaded_files:
-            temp_path = os.path.join("temp_uploaded_" + f.name)
-            with open(temp_path, "wb") as tmp:
-                tmp.write(f.getbuffer())
-            file_paths.append(temp_path)
-
-        halts_df, replenishments_df, all_data_df = analyze_logs(file_paths)
-
-        st.session_state["halts"] = halts_df
-        st.session_state["repls"] = replenishments_df
-        st.session_state["all_data"] = all_data_df
-
-# ----------------------------
-# Results Section
-# ----------------------------
-if "halts" in st.session_state:
-    halts_df = st.session_state["halts"]
-    replenishments_df = st.session_state["repls"]
-
-    # ---------------- Halts ----------------
-    st.subheader("Halts")
-    if not halts_df.empty:
-        halts_df = halts_df.reset_index(drop=True)
-        st.dataframe(halts_df)
-
-        selected_idx = st.number_input(
-            "Enter halt row number to inspect details (from table above)",
-            min_value=0,
-            max_value=len(halts_df) - 1,
-            step=1,
-            key="halt_select"
-        )
-
-        if st.button("Show halt details"):
-            selected_halt = halts_df.loc[selected_idx]
-            file_path = selected_halt["FilePath"]
-            part_num = selected_halt["PartNumber"]
-
-            # Re-read that specific file
-            df = pd.read_csv(
-                file_path,
-                encoding="latin1",
-                skiprows=2,
-                usecols=range(12),
-                engine="python",
-                on_bad_lines="skip"
-            )
-            df = df.rename(columns={
-                df.columns[1]: "PartNumber",
-                df.columns[2]: "Description",
-                df.columns[3]: "Reference",
-                df.columns[6]: "BatchNumber",
-                df.columns[7]: "ColumnH",   # Added
-                df.columns[8]: "ColumnI",   # Added
-                df.columns[11]: "Result"
-            })
-            subset = df[df["PartNumber"] == part_num].copy().reset_index()
-            subset.rename(columns={"index": "RowNumber"}, inplace=True)
-
-            st.write(f"All placements for part {part_num} in file {selected_halt['File']}")
-            st.dataframe(subset)
-
-    # ---------------- Replenishments ----------------
-    st.subheader("Replenishments")
-    if not replenishments_df.empty:
-        replenishments_df = replenishments_df.reset_index(drop=True)
-        st.dataframe(replenishments_df)
-
-        selected_idx_repl = st.number_input(
-            "Enter replenishment row number to inspect details (from table above)",
-            min_value=0,
-            max_value=len(replenishments_df) - 1,
-            step=1,
-            key="repl_select"
-        )
-
-        if st.button("Show replenishment details"):
-            selected_repl = replenishments_df.loc[selected_idx_repl]
-            file_path = selected_repl["FilePath"]
-            part_num = selected_repl["PartNumber"]
-
-            # Re-read that specific file
-            df = pd.read_csv(
-                file_path,
-                encoding="latin1",
-                skiprows=2,
-                usecols=range(12),
-                engine="python",
-                on_bad_lines="skip"
-            )
-            df = df.rename(columns={
-                df.columns[1]: "PartNumber",
-                df.columns[2]: "Description",
-                df.columns[3]: "Reference",
-                df.columns[6]: "BatchNumber",
-                df.columns[7]: "ColumnH",   # Added
-                df.columns[8]: "ColumnI",   # Added
-                df.columns[11]: "Result"
-            })
-            subset = df[df["PartNumber"] == part_num].copy().reset_index()
-            subset.rename(columns={"index": "RowNumber"}, inplace=True)
-
-            st.write(f"All placements for part {part_num} in file {selected_repl['File']}")
-            st.dataframe(subset)
-
-
+import csv
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from matplotlib.figure import Figure
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv
+import streamlit as st
+from numba import njit
+from pandas.api.types import union_categoricals
+
+# ----------------------------
+# Failure code meaningss
+# ----------------------------
+failure_meanings = {
+    2: "Rejected by vision before electrical test",
+    3: "Rejected by vision after electrical test",
+    4: "Rejected by electrical test",
+    5: "Not placed (lost after electrical test)",
+    6: "Not taken by the machine",
+    7: "Rejected by vision before pick-up"
+}
+
+# Fixed-size lookup table for "is this a known failure code": a single
+# vectorized gather replaces np.isin / per-row dict membership tests
+FAIL_LUT = np.zeros(256, dtype=np.bool_)
+FAIL_LUT[sorted(failure_meanings)] = True
+
+# On-disk cache of analysis results, keyed by upload contents; unlike
+# st.cache_data this survives app restarts
+CACHE_DIR = "cache"
+
+# Above this size a file is parsed with the serial streaming reader to
+# cap parse-buffer memory; below it, Arrow's parallel reader is faster
+STREAM_THRESHOLD = 128 << 20
+
+# Failure meanings as a numpy-indexable table: labelling a whole column
+# of episodes becomes one gather instead of per-row dict lookups
+FAILURE_TABLE = np.array(
+    [failure_meanings.get(c, "Unknown failure") for c in range(8)], dtype=object
+)
+
+# Preformatted "code → meaning" fragments indexed by failure code, so
+# event rows join three array gathers instead of formatting per episode
+FAIL_TEXT = np.array(
+    [f"{c} → {failure_meanings.get(c)}" for c in range(8)], dtype=object
+)
+
+# Low-cardinality string columns stored as category so groupby,
+# value_counts and equality tests run on int codes, not Python strings
+CATEGORY_COLUMNS = ["PartNumber", "Description", "Reference", "BatchNumber", "ProductName", "File"]
+
+# Names for the 12 log columns we keep (by position); columns with no
+# analysis role are named by their spreadsheet letter, like ColumnH/I
+LOG_COLUMN_NAMES = {
+    0: "ColumnA",
+    1: "PartNumber",
+    2: "Description",
+    3: "Reference",
+    4: "ColumnE",
+    5: "ColumnF",
+    6: "BatchNumber",
+    7: "ColumnH",
+    8: "ColumnI",
+    9: "ColumnJ",
+    10: "ColumnK",
+    11: "Result"
+}
+
+
+@njit(cache=True)
+def _detect_episodes(part_id, result, batch_code, fail_lut, pass_pos):
+    """Find and classify failure episodes in one walk over the flat arrays.
+
+    Rows are sorted so each part is contiguous; the walk detects three
+    consecutive known failures of one part, finds that part's next
+    passing placement and compares batch codes to split halts from
+    replenishments. pass_pos holds the sorted positions of all passing
+    rows, so that lookup is a binary search rather than a forward scan.
+    Compiled once per session; runtime is negligible even for millions
+    of rows.
+    """
+    n = result.size
+    halt_idx = np.empty(n // 3 + 1, np.int64)  # at most one episode per 3 rows
+    repl_idx = np.empty(n // 3 + 1, np.int64)
+    nh = 0
+    nr = 0
+
+    i = 0
+    while i <= n - 3:
+        p = part_id[i]
+        r0 = result[i]
+        r1 = result[i + 1]
+        r2 = result[i + 2]
+        if (part_id[i + 1] == p and part_id[i + 2] == p
+                and 0 <= r0 < fail_lut.size and fail_lut[r0]
+                and 0 <= r1 < fail_lut.size and fail_lut[r1]
+                and 0 <= r2 < fail_lut.size and fail_lut[r2]):
+            # Next passing placement of the same part after the window;
+            # parts are contiguous, so the first pass at or beyond i+3
+            # either belongs to this part or the part has none left
+            next_pass = -1
+            k = np.searchsorted(pass_pos, i + 3)
+            if k < pass_pos.size and part_id[pass_pos[k]] == p:
+                next_pass = pass_pos[k]
+
+            if next_pass >= 0 and batch_code[next_pass] != batch_code[i]:
+                repl_idx[nr] = i
+                nr += 1
+            else:
+                halt_idx[nh] = i
+                nh += 1
+            i += 3  # windows may not overlap within a part
+        else:
+            i += 1
+
+    return halt_idx[:nh], repl_idx[:nr]
+
+
+def fast_crosstab(a, b):
+    """Contingency table of two columns via factorize + np.add.at.
+
+    Equivalent to pd.crosstab(a, b) but a single vectorized scatter over
+    int codes instead of groupby + pivot machinery.
+    """
+    ac, au = pd.factorize(a, sort=True)
+    bc, bu = pd.factorize(b, sort=True)
+    table = np.zeros((len(au), len(bu)), dtype=np.int32)
+    valid = (ac >= 0) & (bc >= 0)  # factorize encodes missing values as -1
+    np.add.at(table, (ac[valid], bc[valid]), 1)
+    return pd.DataFrame(table, index=au, columns=bu)
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def build_heatmap(batch_corr):
+    """Render the batch/fail-type crosstab as an annotated heatmap figure.
+
+    Cached as a resource so reruns that don't change the underlying
+    counts (widget interactions, detail lookups) reuse the already-drawn
+    figure instead of rasterizing it again. Built on a bare Figure, not
+    pyplot: pyplot's global registry would pin every figure for the life
+    of the process, including ones the cache has already evicted.
+    """
+    vals = batch_corr.to_numpy()
+    fig = Figure()
+    ax = fig.subplots()
+    im = ax.imshow(vals, cmap="Reds")
+    ax.set_xticks(range(len(batch_corr.columns)))
+    ax.set_xticklabels(batch_corr.columns, rotation=45, ha="right")
+    ax.set_yticks(range(len(batch_corr.index)))
+    ax.set_yticklabels(batch_corr.index)
+    # Past a few hundred cells the labels overlap into noise and each one
+    # is a separate Text artist, so leave big crosstabs to the colormap
+    if vals.size <= 500:
+        for (hm_i, hm_j), v in np.ndenumerate(vals):
+            ax.text(hm_j, hm_i, v, ha="center", va="center")
+    fig.colorbar(im, ax=ax)
+    return fig
+
+
+def concat_logs(frames):
+    """Concatenate per-file frames, unifying category dtypes.
+
+    pd.concat silently falls back to object dtype when category columns
+    have different categories, so the categories are unioned first.
+    """
+    cat_cols = [
+        c for c in frames[0].columns
+        if isinstance(frames[0][c].dtype, pd.CategoricalDtype)
+    ]
+    for c in cat_cols:
+        categories = union_categoricals([f[c] for f in frames]).categories
+        for f in frames:
+            f[c] = pd.Categorical(f[c], categories=categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _write_sheet(workbook, name, df):
+    """Write df to a fresh worksheet row by row.
+
+    constant_memory flushes each row once the writer moves past it and
+    silently drops later writes to it, so column-major writers (pandas'
+    to_excel among them) corrupt the sheet; every sheet must be emitted
+    row-major like this.
+    """
+    worksheet = workbook.add_worksheet(name)
+    worksheet.write_row(0, 0, list(df.columns))
+    rows = df.to_numpy(dtype=object)
+    # Blank CSV fields come through as nulls (strings_can_be_null);
+    # write_row only accepts None for an empty cell, not pd.NA/NaN
+    rows[pd.isna(rows)] = None
+    for r, row in enumerate(rows, start=1):
+        worksheet.write_row(r, 0, row)
+
+
+def build_excel_export(halts_df, replenishments_df, all_data_df):
+    """Build the Excel report in xlsxwriter's constant_memory mode.
+
+    constant_memory streams each row to disk as it is written instead of
+    holding every cell object in memory; all sheets are written straight
+    from numpy rows, skipping pandas' per-cell formatting path.
+    """
+    output = io.BytesIO()
+    with pd.ExcelWriter(
+        output,
+        engine="xlsxwriter",
+        engine_kwargs={"options": {
+            "constant_memory": True,
+            "strings_to_urls": False,
+            "nan_inf_to_errors": True
+        }}
+    ) as writer:
+        _write_sheet(writer.book, "Halts", halts_df)
+        _write_sheet(writer.book, "Replenishments", replenishments_df)
+        _write_sheet(writer.book, "AllData", all_data_df)
+    return output.getvalue()
+
+
+def read_log_file(data):
+    """Parse a log's raw bytes once with Arrow's multithreaded reader.
+
+    Returns (df, product_name, skipped): df holds the first 12 columns
+    with the analysis columns renamed, product_name comes from cell B1.
+    Malformed rows are skipped as before, but each one is recorded in
+    skipped (row number, field count, raw text) so they can be reported
+    without a second pass over the bytes.
+    """
+    # Cell B1 (first row, second column) carries the product name; a
+    # plain split + csv.reader on that one line is orders of magnitude
+    # cheaper than spinning up a CSV engine for two rows
+    first_line = data.split(b"\n", 1)[0].decode("latin1", errors="replace")
+    row0 = next(csv.reader([first_line]), [])
+    product_name = row0[1] if len(row0) > 1 and row0[1] else "Unknown"
+
+    read_options = pa.csv.ReadOptions(
+        encoding="latin1",
+        skip_rows=3,
+        autogenerate_column_names=True,
+        block_size=4 << 20
+    )
+    # The handler runs only for malformed rows, so recording them costs
+    # nothing on the hot path
+    skipped = []
+
+    def _record_invalid(row):
+        skipped.append((row.number, row.actual_columns, row.text))
+        return "skip"
+
+    parse_options = pa.csv.ParseOptions(
+        invalid_row_handler=_record_invalid
+    )
+
+    def convert_options(result_type):
+        return pa.csv.ConvertOptions(
+            include_columns=[f"f{i}" for i in range(12)],
+            include_missing_columns=True,
+            column_types={**{f"f{i}": pa.string() for i in range(11)},
+                          "f11": result_type},
+            strings_can_be_null=True
+        )
+
+    def read_table(result_type):
+        # The multithreaded reader tokenizes blocks in parallel but keeps
+        # them all in flight; past STREAM_THRESHOLD the serial streaming
+        # reader caps that working set at one block, which matters more
+        # than parse speed for very large logs
+        if len(data) > STREAM_THRESHOLD:
+            with pa.csv.open_csv(
+                pa.BufferReader(data),
+                read_options=read_options,
+                parse_options=parse_options,
+                convert_options=convert_options(result_type)
+            ) as reader:
+                return reader.read_all()
+        return pa.csv.read_csv(
+            pa.BufferReader(data),
+            read_options=read_options,
+            parse_options=parse_options,
+            convert_options=convert_options(result_type)
+        )
+
+    # Result (col 11) parses straight to float32, saving the full-column
+    # string pass downstream; genuinely non-numeric values in it are rare
+    # enough that the string fallback almost never runs
+    try:
+        table = read_table(pa.float32())
+    except pa.lib.ArrowInvalid:
+        skipped.clear()  # the fallback re-read sees the same rows again
+        table = read_table(pa.string())
+
+    df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    df = df.rename(columns={df.columns[i]: name for i, name in LOG_COLUMN_NAMES.items()})
+    return df, product_name, skipped
+
+
+# ----------------------------
+# Analysis function
+# ----------------------------
+def parse_one_file(filename, data):
+    """Parse one uploaded file into its relevant frame (worker process).
+
+    Returns (df_relevant, skipped, warning); skipped lists this file's
+    malformed rows, warning is a message to surface in the UI when the
+    file could not be read.
+    """
+    # --- Step 1+2: Single Arrow read gives product name and log data
+    try:
+        df, product_name, skipped = read_log_file(data)
+    except Exception as e:
+        return None, [], f"Skipping {filename}, error reading file: {e}"
+
+    # All 12 parsed columns are kept so the detail views show the full
+    # rows. Only PartNumber is a hard requirement, so mask on that single
+    # column rather than scanning every column for NaN; Result coercion
+    # and batch normalization (stripped once here so the detector and
+    # event rows never strip again) ride the same pass.
+    df_relevant = (
+        df.loc[df["PartNumber"].notna()]
+        .assign(
+            # Already float32 on the normal parse path, so to_numeric is
+            # a pass-through; it only does real work on the string fallback.
+            # Values outside int8 range are garbage, not codes — zero them
+            # rather than letting the downcast wrap them onto real codes
+            Result=lambda d: pd.to_numeric(d["Result"], errors="coerce")
+                               .fillna(0)
+                               .where(lambda s: s.between(0, 127), 0)
+                               .astype("int8"),
+            BatchNumber=lambda d: d["BatchNumber"].str.strip()
+        )
+    )
+
+    # The surviving index labels are still the row's position within
+    # this file's data section; keep them as a column, since concat later
+    # renumbers the index across files
+    df_relevant.insert(0, "RowNumber", df_relevant.index.to_numpy())
+    df_relevant["ProductName"] = product_name
+    df_relevant["File"] = filename
+    for c in CATEGORY_COLUMNS:
+        df_relevant[c] = df_relevant[c].astype("category")
+
+    return df_relevant, [(filename,) + row for row in skipped], None
+
+
+def detect_events(all_data_df):
+    """Run halt/replenishment detection once over the combined data.
+
+    One stable sort on (File, PartNumber) makes every part's placements
+    contiguous across the whole upload set, so a single kernel call
+    covers all files; per-file detection setup is amortized away.
+    Returns (halts_df, replenishments_df).
+    """
+    detect_df = all_data_df.sort_values(["File", "PartNumber"], kind="stable").reset_index(drop=True)
+    res = detect_df["Result"].to_numpy()  # int8: 8x less data per scan
+    if res.size < 3:
+        return pd.DataFrame(), pd.DataFrame()
+
+    # Composite (File, PartNumber) id from the category codes, so parts
+    # with the same number in different files stay separate groups
+    fcodes = detect_df["File"].cat.codes.to_numpy().astype(np.int64)
+    pcodes = detect_df["PartNumber"].cat.codes.to_numpy().astype(np.int64)
+    pid = fcodes * (pcodes.max() + 2) + pcodes
+    # Category codes are already a unique int per batch string
+    batch_code = detect_df["BatchNumber"].cat.codes.to_numpy(dtype=np.int32)
+
+    # Sorted positions of passing rows, computed once for the whole scan
+    pass_pos = np.flatnonzero(res == 0)
+    halt_idx, repl_idx = _detect_episodes(pid, res, batch_code, FAIL_LUT, pass_pos)
+
+    def build_events(idx):
+        # One contiguous gather of the event rows instead of a Python
+        # dict per episode that pd.DataFrame would have to re-infer
+        events = detect_df.iloc[idx][
+            ["ProductName", "File", "PartNumber", "Description",
+             "Reference", "BatchNumber", "ColumnH", "ColumnI"]
+        ].reset_index(drop=True)
+        events["FailCodes"] = list(map(
+            ", ".join,
+            zip(FAIL_TEXT[res[idx]], FAIL_TEXT[res[idx + 1]], FAIL_TEXT[res[idx + 2]])
+        ))
+        events["MainFailType"] = FAILURE_TABLE[res[idx]]
+        return events
+
+    return build_events(halt_idx), build_events(repl_idx)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def analyze_logs(files):
+    """Run the full analysis over (filename, bytes) pairs.
+
+    Files are parsed in parallel worker threads (a single upload skips
+    the pool); detection then runs once over the concatenated data.
+    Keyed on file contents via st.cache_data, so reruns with the same
+    uploads skip parsing and detection entirely. Returns (halts_df,
+    replenishments_df, all_data_df, skipped_df).
+    """
+    # Key on (name, size, bytes) per file: the File column of every
+    # cached frame comes from the filenames, and the length prefixes
+    # keep the hashed stream unambiguous across file boundaries
+    hasher = hashlib.sha1()
+    for name, data in sorted(files):
+        name_bytes = name.encode("utf-8", "surrogatepass")
+        hasher.update(len(name_bytes).to_bytes(8, "little"))
+        hasher.update(name_bytes)
+        hasher.update(len(data).to_bytes(8, "little"))
+        hasher.update(data)
+    cache_key = hasher.hexdigest()
+    cache_paths = {
+        name: os.path.join(CACHE_DIR, f"{cache_key}-{name}.parquet")
+        for name in ("halts", "repls", "all_data", "skipped")
+    }
+    if all(os.path.exists(p) for p in cache_paths.values()):
+        # Parquet reads back in tens of ms where the CSVs took seconds
+        return tuple(
+            pd.read_parquet(p, engine="pyarrow") for p in cache_paths.values()
+        )
+
+    all_data = []
+    skipped_rows = []
+
+    if len(files) > 1:
+        # Threads, not processes: Arrow's CSV reader releases the GIL, so
+        # parses overlap without pickling each file's bytes and DataFrame
+        # across a process boundary
+        max_workers = min(8, os.cpu_count() or 1, len(files))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                parse_one_file,
+                [name for name, _ in files],
+                [data for _, data in files]
+            ))
+    else:
+        results = [parse_one_file(name, data) for name, data in files]
+
+    for df_relevant, skipped, warning in results:
+        skipped_rows.extend(skipped)
+        if warning is not None:
+            st.warning(warning)
+            continue
+        all_data.append(df_relevant)
+
+    skipped_df = pd.DataFrame(
+        skipped_rows, columns=["File", "Row", "Fields", "Text"]
+    )
+
+    all_data_df = concat_logs(all_data) if all_data else pd.DataFrame()
+
+    if all_data_df.empty:
+        halts_df, replenishments_df = pd.DataFrame(), pd.DataFrame()
+    else:
+        halts_df, replenishments_df = detect_events(all_data_df)
+    for events_df in (halts_df, replenishments_df):
+        if not events_df.empty:
+            for c in CATEGORY_COLUMNS + ["MainFailType"]:
+                events_df[c] = events_df[c].astype("category")
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    try:
+        for name, frame in (("halts", halts_df), ("repls", replenishments_df),
+                            ("all_data", all_data_df), ("skipped", skipped_df)):
+            frame.to_parquet(cache_paths[name], engine="pyarrow", compression="zstd")
+    except Exception:
+        pass  # the cache is best-effort; analysis results are already in hand
+
+    return halts_df, replenishments_df, all_data_df, skipped_df
+
+
+# ----------------------------
+# Streamlit App
+# ----------------------------
+st.title("PCB Log Analysis Dashboard")
+
+uploaded_files = st.file_uploader(
+    "Upload multiple CSV log files",
+    type=["csv"],
+    accept_multiple_files=True
+)
+
+if uploaded_files:
+    if st.button("Run Analysis"):
+        # Uploads are analyzed straight from their in-memory bytes; no
+        # temp files are written (or leaked) to the working directory
+        halts_df, replenishments_df, all_data_df, skipped_df = analyze_logs(
+            tuple((f.name, f.getvalue()) for f in uploaded_files)
+        )
+
+        st.session_state["halts"] = halts_df
+        st.session_state["repls"] = replenishments_df
+        st.session_state["all_data"] = all_data_df
+        st.session_state["skipped"] = skipped_df
+        # A prepared Excel report belongs to the previous dataset; drop
+        # it so the download button never serves stale results
+        st.session_state.pop("excel_report", None)
+        st.session_state.pop("excel_report_product", None)
+
+        # Precompute the halt summary tables once per analysis; reruns
+        # of the Results section only render these, never recount. The
+        # categories span the whole upload, so drop the zero counts
+        # value_counts emits for categories with no halts at all
+        st.session_state["halt_counts"] = {
+            col: halts_df[col].value_counts().loc[lambda s: s > 0]
+            for col in ("MainFailType", "ProductName", "PartNumber", "BatchNumber")
+        } if not halts_df.empty else {}
+
+        # Per-product views are also split once up front, so the product
+        # filter below is a dict lookup per rerun, not a boolean scan
+        st.session_state["products"] = (
+            sorted(all_data_df["ProductName"].cat.categories)
+            if not all_data_df.empty else []
+        )
+        for key, events_df in (("halts_by_product", halts_df), ("repls_by_product", replenishments_df)):
+            st.session_state[key] = {
+                k: v for k, v in events_df.groupby("ProductName", observed=True, sort=False)
+            } if not events_df.empty else {}
+
+# ----------------------------
+# Results Section
+# ----------------------------
+if "halts" in st.session_state:
+    halts_df = st.session_state["halts"]
+    replenishments_df = st.session_state["repls"]
+
+    # ---------------- Skipped rows ----------------
+    skipped_df = st.session_state.get("skipped")
+    if skipped_df is not None and not skipped_df.empty:
+        with st.expander(f"Skipped rows ({len(skipped_df)})"):
+            st.dataframe(skipped_df)
+
+    # ---------------- Product filter ----------------
+    product_choice = st.selectbox("Product", ["All"] + st.session_state.get("products", []))
+    if product_choice != "All":
+        halts_df = st.session_state["halts_by_product"].get(
+            product_choice, halts_df.iloc[0:0]
+        )
+        replenishments_df = st.session_state["repls_by_product"].get(
+            product_choice, replenishments_df.iloc[0:0]
+        )
+
+    # ---------------- Halts ----------------
+    st.subheader("Halts")
+    if not halts_df.empty:
+        halts_df = halts_df.reset_index(drop=True)
+        st.dataframe(halts_df)
+
+        # ---- Halt Summary (precomputed) ----
+        # st.bar_chart renders client-side via Vega-Lite: no server-side
+        # figure rasterization per rerun
+        st.subheader("Halt Summary")
+        summary_cols = st.columns(2)
+        for pos, (col, counts) in enumerate(st.session_state.get("halt_counts", {}).items()):
+            with summary_cols[pos % 2]:
+                st.write(f"Halts by {col}")
+                st.bar_chart(counts)
+
+        # ---- Batch Fail Correlation ----
+        st.subheader("Batch Fail Correlation")
+        batch_corr = fast_crosstab(halts_df["BatchNumber"], halts_df["MainFailType"])
+        st.pyplot(build_heatmap(batch_corr))
+
+        selected_idx = st.number_input(
+            "Enter halt row number to inspect details (from table above)",
+            min_value=0,
+            max_value=len(halts_df) - 1,
+            step=1,
+            key="halt_select"
+        )
+
+        if st.button("Show halt details"):
+            selected_halt = halts_df.loc[selected_idx]
+            part_num = selected_halt["PartNumber"]
+
+            # Filter the already-parsed data instead of re-reading the file
+            all_data_df = st.session_state["all_data"]
+            subset = all_data_df[
+                (all_data_df["File"] == selected_halt["File"])
+                & (all_data_df["PartNumber"] == part_num)
+            ].reset_index(drop=True)
+
+            st.write(f"All placements for part {part_num} in file {selected_halt['File']}")
+            st.dataframe(subset)
+
+    # ---------------- Excel export ----------------
+    # Building the workbook is the most expensive thing on this page, so
+    # it only happens when explicitly requested instead of on every rerun
+    if not halts_df.empty or not replenishments_df.empty:
+        if st.button("Prepare Excel report"):
+            st.session_state["excel_report"] = build_excel_export(
+                halts_df, replenishments_df, st.session_state["all_data"]
+            )
+            st.session_state["excel_report_product"] = product_choice
+        if (
+            "excel_report" in st.session_state
+            and st.session_state.get("excel_report_product") == product_choice
+        ):
+            st.download_button(
+                "Download Excel report",
+                data=st.session_state["excel_report"],
+                file_name="pcb_log_analysis.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+
+    # ---------------- Replenishments ----------------
+    st.subheader("Replenishments")
+    if not replenishments_df.empty:
+        replenishments_df = replenishments_df.reset_index(drop=True)
+        st.dataframe(replenishments_df)
+
+        selected_idx_repl = st.number_input(
+            "Enter replenishment row number to inspect details (from table above)",
+            min_value=0,
+            max_value=len(replenishments_df) - 1,
+            step=1,
+            key="repl_select"
+        )
+
+        if st.button("Show replenishment details"):
+            selected_repl = replenishments_df.loc[selected_idx_repl]
+            part_num = selected_repl["PartNumber"]
+
+            # Filter the already-parsed data instead of re-reading the file
+            all_data_df = st.session_state["all_data"]
+            subset = all_data_df[
+                (all_data_df["File"] == selected_repl["File"])
+                & (all_data_df["PartNumber"] == part_num)
+            ].reset_index(drop=True)
+
+            st.write(f"All placements for part {part_num} in file {selected_repl['File']}")
+            st.dataframe(subset)
+
+